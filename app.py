@@ -1,25 +1,207 @@
-from flask import Flask, flash, redirect, render_template, request, url_for, Blueprint, send_file, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, flash, redirect, render_template, request, url_for, Blueprint, send_file, jsonify, Response, stream_with_context, make_response, session
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import sqlite3
-from helpers import build_transaction_pdf, get_transaction_data, get_transaction_summary, format_transactions, get_last_month_expenses, build_transaction_pdf, calculate_financial_health
+from helpers import build_transaction_pdf, iter_transaction_data, get_transaction_summary, format_transactions, build_transaction_pdf, calculate_financial_health, get_db_connection, release_db_connection, DATABASE, configure_connection, INDEXES, generate_transaction_csv, to_cents, fetch_all, get_category_summary_db, bulk_insert_transactions
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
+from flask_caching import Cache
+from flask_compress import Compress
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 import tempfile
-from collections import defaultdict
-from datetime import datetime, timedelta
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import hashlib
+import threading
+import unicodedata
+import uuid
+from urllib.parse import quote
 from dotenv import load_dotenv
 
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
+# Shared session so summary calls reuse warm TLS connections to the Gemini API
+GEMINI_SESSION = requests.Session()
+GEMINI_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+# (connect, read) timeouts so a stalled API call can't hold a worker forever
+GEMINI_TIMEOUT = (3, 15)
+SUMMARY_CACHE_TTL = 3600
+
 # -------------------- Setup Flask App --------------------
 app = Flask(__name__)
 app.secret_key = "supersecretkey"
 
+# Templates only change on deploy, so skip the per-render mtime checks
+app.config["TEMPLATES_AUTO_RELOAD"] = False
+app.jinja_env.auto_reload = False
+
+# gzip/brotli responses; the HTML pages and chart JSON compress very well
+Compress(app)
+
 # Blueprint for reports
 report_bp = Blueprint("report", __name__)
 
+# In-process cache for data the dashboard polls repeatedly
+cache = Cache(app, config={"CACHE_TYPE": "SimpleCache"})
+DASHBOARD_DATA_TTL = 30
+REPORT_TOTALS_TTL = 300
+
+
+def dashboard_data_key():
+    return f"dd:{current_user.id}"
+
+
+def user_write_version(user_id):
+    """Opaque token that changes every time the user's transactions change."""
+    version = cache.get(f"wv:{user_id}")
+    if version is None:
+        # add() keeps a token a concurrent writer may have just set
+        cache.add(f"wv:{user_id}", uuid.uuid4().hex)
+        version = cache.get(f"wv:{user_id}")
+    return version
+
+
+def invalidate_user_cache(user_id):
+    """Drop cached dashboard data and retire cached totals once the user's transactions change."""
+    cache.delete(f"dd:{user_id}")
+    # A fresh, never-reused token, so totals computed before this write are
+    # filed under the old version and never read again
+    cache.set(f"wv:{user_id}", uuid.uuid4().hex)
+
+
+def cached_transaction_summary(user_id):
+    """Report totals for a user, cached until their next write."""
+    key = f"ts:{user_id}:{user_write_version(user_id)}"
+    totals = cache.get(key)
+    if totals is None:
+        totals = get_transaction_summary(user_id)
+        cache.set(key, totals, timeout=REPORT_TOTALS_TTL)
+    return totals
+
+
+# Rate limits for endpoints that call paid external APIs
+limiter = Limiter(get_remote_address, app=app, storage_uri="memory://")
+
+
+# Password hashing is deliberately CPU-heavy; a small bounded pool keeps a
+# burst of logins or sign-ups from tying up every server thread at once
+HASH_POOL = ThreadPoolExecutor(max_workers=2)
+
+# Waitress worker threads (waitress's own default is 4)
+SERVER_THREADS = int(os.environ.get("WAITRESS_THREADS", 4))
+
+# Runs one side of a request's independent read queries while the request
+# thread runs the other; WAL lets them share the file. One worker per server
+# thread, so concurrent requests never queue behind each other here.
+QUERY_POOL = ThreadPoolExecutor(max_workers=SERVER_THREADS)
+
+# Argon2id at OWASP's baseline: 46 MiB memory, 2 passes, 1 lane
+password_hasher = PasswordHasher(time_cost=2, memory_cost=47104, parallelism=1)
+
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+
+def verify_password(stored_hash, password):
+    """
+    Check a password against its stored hash.
+
+    Returns (matches, new_hash). new_hash is set when the stored hash is a
+    legacy Werkzeug hash or uses outdated Argon2 parameters and should be
+    replaced; otherwise it is None.
+    """
+    if not stored_hash.startswith("$argon2"):
+        # Accounts created before the switch to Argon2 still carry Werkzeug hashes
+        if not check_password_hash(stored_hash, password):
+            return False, None
+        return True, hash_password(password)
+
+    try:
+        password_hasher.verify(stored_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False, None
+
+    if password_hasher.check_needs_rehash(stored_hash):
+        return True, hash_password(password)
+    return True, None
+
+
+# -------------------- SQL Statements --------------------
+# Hot queries are kept as constants so every request passes the exact same
+# text and hits sqlite3's prepared statement cache. Amounts are stored as
+# integer cents and only converted to dollars after summing.
+
+SQL_USER_BY_ID = "SELECT id, username FROM users WHERE id = ?"
+
+SQL_USER_BY_NAME = "SELECT id, username, hash FROM users WHERE username = ?"
+
+SQL_USERNAME_EXISTS = "SELECT 1 FROM users WHERE username = ?"
+
+SQL_SUMS = """
+    SELECT COALESCE(SUM(CASE WHEN type='income' THEN amount_cents END), 0) / 100.0,
+           COALESCE(SUM(CASE WHEN type='expenses' THEN amount_cents END), 0) / 100.0
+    FROM transactions
+    WHERE user_id=?
+"""
+
+SQL_ANALYTICS_SUMS = """
+    SELECT COALESCE(SUM(CASE WHEN type='income' THEN amount_cents END), 0) / 100.0,
+           COALESCE(SUM(CASE WHEN type='expenses' THEN amount_cents END), 0) / 100.0,
+           COALESCE(ROUND(AVG(CASE WHEN type='expenses' THEN amount_cents END) / 100.0, 2), 0),
+           COALESCE(SUM(CASE WHEN type='expenses'
+                              AND date >= date('now', 'localtime', 'start of month', '-1 month')
+                              AND date < date('now', 'localtime', 'start of month')
+                         THEN amount_cents END), 0) / 100.0
+    FROM transactions
+    WHERE user_id=?
+"""
+
+SQL_TXN_VERSION = "SELECT MAX(id), COUNT(*) FROM transactions WHERE user_id=?"
+
+SQL_DASH_RECENT = "SELECT id, description, category, type, amount_cents / 100.0 AS amount, date FROM transactions WHERE user_id=? ORDER BY date DESC LIMIT 5"
+
+SQL_TREND = """
+    SELECT date,
+           COALESCE(SUM(CASE WHEN type='income' THEN amount_cents END), 0) / 100.0,
+           COALESCE(SUM(CASE WHEN type='expenses' THEN amount_cents END), 0) / 100.0
+    FROM transactions
+    WHERE user_id=?
+    GROUP BY date
+    ORDER BY date
+"""
+
+SQL_TYPE_CATEGORY_TOTALS = """
+    SELECT type, category, SUM(amount_cents) / 100.0 as total
+    FROM transactions
+    WHERE user_id=?
+    GROUP BY type, category
+"""
+
+SQL_CAT_BREAKDOWN = """
+    SELECT category, SUM(amount_cents) / 100.0 as total
+    FROM transactions
+    WHERE user_id=? AND type='expenses'
+    GROUP BY category
+"""
+
+SQL_TXN_INSERT = "INSERT INTO transactions (user_id, description, category, type, amount_cents, date) VALUES (?, ?, ?, ?, ?, ?)"
+
+SQL_TXN_DELETE = "DELETE FROM transactions WHERE id=? AND user_id=?"
+
+SQL_TXN_LIST = "SELECT id, description, category, type, amount_cents / 100.0 AS amount, date FROM transactions WHERE user_id=? ORDER BY date DESC"
+
 
 # -------------------- Flask-Login Setup --------------------
 login_manager = LoginManager()
@@ -36,12 +218,10 @@ class User(UserMixin):
 
     @staticmethod
     def get(user_id):
-        conn = sqlite3.connect("finance.db")
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        user = cur.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(SQL_USER_BY_ID, (user_id,))
+            user = cur.fetchone()
         if not user:
             return None
         return User(user["id"], user["username"])
@@ -54,16 +234,72 @@ def load_user(user_id):
 # -------------------- DB Connection Helper --------------------
 
 
-def get_db_connection():
-    conn = sqlite3.connect("finance.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+@app.teardown_request
+def teardown_db(exception):
+    # Connections are pooled per thread, so release instead of closing
+    release_db_connection()
 
 # -------------------- Database Setup Function --------------------
+# Bump whenever init_db gains a new table, index or migration
+SCHEMA_VERSION = 1
+
+TXN_TYPES = ("income", "expenses")
+
+TRANSACTIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        description TEXT NOT NULL,
+        category TEXT NOT NULL,
+        type TEXT NOT NULL{type_check},
+        amount_cents INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+"""
+
+TYPE_CHECK = " CHECK(type IN ('income', 'expenses'))"
+
+
+def migrate_amounts_to_cents(conn):
+    """Rebuild a transactions table that still stores REAL amounts as integer cents."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(transactions)")}
+    if "amount_cents" in columns:
+        return
+
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'").fetchone()
+
+    conn.execute("BEGIN")
+    # Older databases never constrained type, so rows with other values may
+    # exist; the rebuilt table keeps them instead of failing the copy. The
+    # routes check type against TXN_TYPES on every new write.
+    conn.execute(TRANSACTIONS_TABLE.format(name="transactions_new", type_check=""))
+    conn.execute("""
+        INSERT INTO transactions_new (id, user_id, description, category, type, amount_cents, date)
+        SELECT id, user_id, description, category, type, CAST(ROUND(amount * 100) AS INTEGER), date
+        FROM transactions
+    """)
+    conn.execute("DROP TABLE transactions")
+    conn.execute("ALTER TABLE transactions_new RENAME TO transactions")
+    # Keep AUTOINCREMENT from handing out ids of rows deleted before the rebuild
+    if seq:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'transactions'", (seq[0],))
+    conn.commit()
+    print("Migrated transaction amounts to integer cents.")
+
+
 def init_db():
+    """Create or migrate the schema. Returns True once it is current."""
+    conn = None
     try:
         # Use the same database name 'finance.db'
-        conn = sqlite3.connect("finance.db")
+        conn = sqlite3.connect(DATABASE)
+
+        # Already set up by an earlier start; skip all of the DDL below
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return True
+
+        configure_connection(conn)
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -73,27 +309,38 @@ def init_db():
                 hash TEXT NOT NULL
             );
         """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                description TEXT NOT NULL,
-                category TEXT NOT NULL,
-                type TEXT NOT NULL,
-                amount REAL NOT NULL,
-                date TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            );
-        """)
+        cursor.execute(TRANSACTIONS_TABLE.format(name="transactions", type_check=TYPE_CHECK))
+        migrate_amounts_to_cents(conn)
 
+        cursor.executescript(INDEXES)
+
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
         print("Database setup complete: users and transactions tables ensured.")
+        return True
     except Exception as e:
         print(f"Error during database initialization: {e}")
+        return False
     finally:
         if conn:
             conn.close()
 
+
+# `flask run` never reaches the __main__ block, so the schema is also
+# checked before the first request any server handles. A failed setup is
+# retried on the next request rather than leaving the app half-migrated.
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+@app.before_request
+def ensure_schema():
+    global _schema_ready
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                _schema_ready = init_db()
+
 # -------------------- Routes --------------------
 
 
@@ -121,13 +368,23 @@ def login():
 
         with get_db_connection() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM users WHERE username = ?", (username,))
+            cur.execute(SQL_USER_BY_NAME, (username,))
             user_data = cur.fetchone()
 
-        if user_data is None or not check_password_hash(user_data["hash"], password):
+        if user_data is None:
+            flash("Invalid username or password", "danger")
+            return render_template("login.html")
+
+        valid, new_hash = HASH_POOL.submit(verify_password, user_data["hash"], password).result()
+        if not valid:
             flash("Invalid username or password", "danger")
             return render_template("login.html")
 
+        # Upgrade legacy or outdated hashes while the plaintext is at hand
+        if new_hash:
+            with get_db_connection() as conn:
+                conn.execute("UPDATE users SET hash = ? WHERE id = ?", (new_hash, user_data["id"]))
+
         user_obj = User(user_data["id"], user_data["username"])
         login_user(user_obj)
 
@@ -167,13 +424,13 @@ def register():
         # Check if the username already exists
         with get_db_connection() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM users WHERE username = ?", (username,))
+            cur.execute(SQL_USERNAME_EXISTS, (username,))
             if cur.fetchone():
                 flash("Username already exists", "warning")
                 return render_template("register.html")
 
             # Hash the password and store in the database
-            hashed_pw = generate_password_hash(password)
+            hashed_pw = HASH_POOL.submit(hash_password, password).result()
             cur.execute("INSERT INTO users (username, hash) VALUES (?, ?)", (username, hashed_pw))
             conn.commit()
 
@@ -199,20 +456,35 @@ def dashboard():
     user_id = current_user.id
     with get_db_connection() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='income'", (user_id,))
-        total_income = cur.fetchone()[0] or 0
 
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='expenses'", (user_id,))
-        total_expenses = cur.fetchone()[0] or 0
+        # Ids are AUTOINCREMENT and never reused, so the newest id plus the row
+        # count changes whenever a transaction is added or deleted
+        cur.execute(SQL_TXN_VERSION, (user_id,))
+        max_id, txn_count = cur.fetchone()
+        etag = hashlib.md5(
+            f"{user_id}:{current_user.username}:{max_id}:{txn_count}:{datetime.now().year}".encode()
+        ).hexdigest()
+
+        # Pending flash messages are rendered into the page, so never 304 then.
+        # The ETag is weak because Flask-Compress rewrites strong ones per
+        # encoding, which would stop the browser's copy from ever matching.
+        has_flashes = "_flashes" in session
+        if not has_flashes and request.if_none_match.contains_weak(etag):
+            resp = Response(status=304)
+            resp.set_etag(etag, weak=True)
+            return resp
+
+        cur.execute(SQL_SUMS, (user_id,))
+        total_income, total_expenses = cur.fetchone()
 
         balance = total_income - total_expenses
 
-        cur.execute("SELECT * FROM transactions WHERE user_id=? ORDER BY date DESC LIMIT 5", (user_id,))
+        cur.execute(SQL_DASH_RECENT, (user_id,))
         transactions = cur.fetchall()
 
     transactions = format_transactions(transactions)
 
-    return render_template(
+    resp = make_response(render_template(
         "dashboard.html",
         total_income=total_income,
         total_expenses=total_expenses,
@@ -220,41 +492,46 @@ def dashboard():
         current_year=datetime.now().year,
         transactions=transactions,
         user=current_user
-    )
+    ))
+    # A page carrying flash messages must not be revalidated into a 304 later
+    # (Flask-Compress evaluates conditional requests too), so it gets no ETag
+    if not has_flashes:
+        resp.set_etag(etag, weak=True)
+    # Let the browser keep the page but always revalidate it
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
 
 
 @app.route("/dashboard/data")
 @login_required
+@cache.cached(timeout=DASHBOARD_DATA_TTL, key_prefix=dashboard_data_key)
 def dashboard_data():
     user_id = current_user.id
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT amount, type, date FROM transactions WHERE user_id=? ORDER BY date ASC", (user_id,))
-        rows = cur.fetchall()
-
-        # Total income & expenses for doughnut (Income vs Expenses)
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='income'", (user_id,))
-        total_income = cur.fetchone()[0] or 0
-
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='expenses'", (user_id,))
-        total_expenses = cur.fetchone()[0] or 0
-
-        # Category breakdown for pie chart (Percent of income spent on each category)
-        cur.execute("""
-            SELECT category, SUM(amount) as total
-            FROM transactions
-            WHERE user_id=? AND type='expenses'
-            GROUP BY category
-        """, (user_id,))
-        categories_data = cur.fetchall()
+
+    # Daily income/expense totals for the trend chart, and per-category totals
+    # for both types (income/expense totals and the pie chart breakdown are
+    # both split out of that one result). The two scans are independent, so
+    # the trend runs on the query pool while this thread runs the totals.
+    trend_future = QUERY_POOL.submit(fetch_all, SQL_TREND, (user_id,))
+    totals_data = fetch_all(SQL_TYPE_CATEGORY_TOTALS, (user_id,))
+    rows = trend_future.result()
+
+    # Total income & expenses for doughnut (Income vs Expenses)
+    total_income = 0
+    total_expenses = 0
+    categories_data = []
+    for txn_type, category, total in totals_data:
+        if txn_type == "income":
+            total_income += total
+        else:
+            total_expenses += total
+            categories_data.append((category, total))
 
     # Calculate percentage of income spent on each category
     category_percentages = {}
     if total_income > 0:
-        for row in categories_data:
-            category = row[0]
-            total_spent = row[1]
+        for category, total_spent in categories_data:
             percentage = (total_spent / total_income) * 100  # Calculate percentage
             category_percentages[category] = percentage
 
@@ -262,21 +539,14 @@ def dashboard_data():
     categories = list(category_percentages.keys())
     percentages = list(category_percentages.values())
 
-    # Prepare trend data
-    trends = defaultdict(lambda: {"income": 0, "expenses": 0})
-    for row in rows:
-        date_str = row["date"]  # Assuming stored as 'YYYY-MM-DD'
-        amount = row["amount"]
-        txn_type = row["type"]
-        if txn_type == "income":
-            trends[date_str]["income"] += amount
-        else:
-            trends[date_str]["expenses"] += amount
-
-    # Sort by date
-    sorted_dates = sorted(trends.keys())
-    income_trend = [trends[date]["income"] for date in sorted_dates]
-    expenses_trend = [trends[date]["expenses"] for date in sorted_dates]
+    # Prepare trend data (already grouped and sorted by date)
+    sorted_dates = []
+    income_trend = []
+    expenses_trend = []
+    for date_str, income, expenses in rows:
+        sorted_dates.append(date_str)  # Assuming stored as 'YYYY-MM-DD'
+        income_trend.append(income)
+        expenses_trend.append(expenses)
 
     return jsonify({
         "total_income": total_income,
@@ -296,26 +566,37 @@ def transactions():
     user_id = current_user.id
 
     if request.method == "POST":
+        try:
+            amount_cents = to_cents(request.form.get("amount"))
+        except ValueError:
+            flash("Amount must be a valid number.", "danger")
+            return redirect(url_for("transactions"))
+
+        if request.form.get("type") not in TXN_TYPES:
+            flash("Transaction type must be income or expenses.", "danger")
+            return redirect(url_for("transactions"))
+
         with get_db_connection() as conn:
             cur = conn.cursor()
             cur.execute(
-                "INSERT INTO transactions (user_id, description, category, type, amount, date) VALUES (?, ?, ?, ?, ?, ?)",
+                SQL_TXN_INSERT,
                 (
                     user_id,
                     request.form.get("description"),
                     request.form.get("category"),
                     request.form.get("type"),
-                    request.form.get("amount"),
+                    amount_cents,
                     request.form.get("date")
                 )
             )
             conn.commit()
+        invalidate_user_cache(user_id)
         flash("Transaction added successfully!", "success")
         return redirect(url_for("transactions"))
 
     with get_db_connection() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM transactions WHERE user_id=? ORDER BY date DESC", (user_id,))
+        cur.execute(SQL_TXN_LIST, (user_id,))
         transactions = cur.fetchall()
 
     transactions = format_transactions(transactions)
@@ -323,30 +604,56 @@ def transactions():
     return render_template("transactions.html", transactions=transactions, current_year=datetime.now().year, user=current_user)
 
 
+@app.route("/transactions/bulk", methods=["POST"])
+@login_required
+def bulk_transactions():
+    user_id = current_user.id
+    payload = request.get_json(silent=True)
+
+    if not isinstance(payload, list) or not payload:
+        return jsonify({"error": "Expected a non-empty JSON list of transactions"}), 400
+
+    try:
+        rows = [
+            (txn["description"], txn["category"], txn["type"], to_cents(txn["amount"]), txn["date"])
+            for txn in payload
+        ]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Each transaction needs a description, category, type, amount and date"}), 400
+
+    # Anything but a string (a nested object, say) can't be bound by sqlite3
+    if not all(isinstance(value, str) for row in rows for value in (row[0], row[1], row[2], row[4])):
+        return jsonify({"error": "Description, category, type and date must be strings"}), 400
+
+    if any(row[2] not in TXN_TYPES for row in rows):
+        return jsonify({"error": "Transaction type must be income or expenses"}), 400
+
+    try:
+        inserted = bulk_insert_transactions(user_id, rows)
+    except sqlite3.IntegrityError as e:
+        return jsonify({"error": str(e)}), 400
+
+    invalidate_user_cache(user_id)
+    return jsonify({"inserted": inserted}), 201
+
+
 @app.route('/delete_transaction/<int:txn_id>', methods=['POST'])
 @login_required
 def delete_transaction(txn_id):
     try:
-        conn = sqlite3.connect('finance.db')
-        cursor = conn.cursor()
+        # Matching on user_id too means a user can only delete their own rows
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_TXN_DELETE, (txn_id, current_user.id))
 
-        # Optional: ensure user can only delete their own transaction
-        cursor.execute("SELECT user_id FROM transactions WHERE id=?", (txn_id,))
-        row = cursor.fetchone()
-        if not row:
-            flash("Transaction not found.", "danger")
-            return redirect(url_for('transactions'))
-        if row[0] != current_user.id:
-            flash("Unauthorized action.", "danger")
+        if cursor.rowcount == 0:
+            flash("Transaction not found or unauthorized.", "danger")
             return redirect(url_for('transactions'))
 
-        cursor.execute("DELETE FROM transactions WHERE id=?", (txn_id,))
-        conn.commit()
+        invalidate_user_cache(current_user.id)
         flash("Transaction deleted successfully.", "success")
     except Exception as e:
         flash("Error deleting transaction.", "danger")
-    finally:
-        conn.close()
 
     return redirect(url_for('transactions'))
 
@@ -359,22 +666,10 @@ def analytics():
     user_id = current_user.id
     with get_db_connection() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='income'", (user_id,))
-        total_income = cur.fetchone()[0] or 0
-
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='expenses'", (user_id,))
-        total_expenses = cur.fetchone()[0] or 0
-
-        cur.execute(
-            "SELECT ROUND(AVG(amount), 2) FROM transactions WHERE user_id=? AND type='expenses'", (user_id,))
-        avg_expense = cur.fetchone()[0] or 0
-
-        cur.execute("""
-            SELECT category, SUM(amount) as total
-            FROM transactions
-            WHERE user_id=? AND type='expenses'
-            GROUP BY category
-        """, (user_id,))
+        cur.execute(SQL_ANALYTICS_SUMS, (user_id,))
+        total_income, total_expenses, avg_expense, last_month_expenses = cur.fetchone()
+
+        cur.execute(SQL_CAT_BREAKDOWN, (user_id,))
         categories_data = cur.fetchall()
 
         category_expenses = {row['category']: row['total'] for row in categories_data}
@@ -387,21 +682,26 @@ def analytics():
                            balance=balance,
                            category_expenses=category_expenses,
                            avg_expense=avg_expense,
+                           last_month_expenses=last_month_expenses,
                            current_year=datetime.now().year,
                            user=current_user)
 
 
 # Route to generate financial summary
 @app.route("/analytics/generate_summary", methods=["POST"])
+@login_required
+@limiter.limit("5/minute")
 def generate_summary():
     user_data = request.get_json()
 
     total_expenses = user_data.get("total_expenses", 0)
     total_income = user_data.get("total_income", 0)
     category_expenses = user_data.get("category_expenses", {})
+    if not isinstance(category_expenses, dict):
+        return jsonify({"error": "category_expenses must be an object of category totals"}), 400
 
-   # Fetch previous month's total expenses (add query to get previous month's data)
-    last_month_expenses = get_last_month_expenses(current_user.id)
+    # Previous month's expenses come from the analytics page's aggregate query
+    last_month_expenses = user_data.get("last_month_expenses", 0)
 
     # Build a prompt for the AI
     prompt = f"""
@@ -413,6 +713,20 @@ def generate_summary():
     Provide insights, trends, and friendly advice on how to reduce expenses.
     """
 
+    # The same financial picture always gets the same summary, so key the
+    # cache on a hash of the inputs and skip the API call on repeat loads
+    state = (
+        current_user.id,
+        total_income,
+        total_expenses,
+        sorted(category_expenses.items()),
+        last_month_expenses,
+    )
+    summary_key = f"sum:{hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()}"
+    summary_text = cache.get(summary_key)
+    if summary_text is not None:
+        return jsonify({"summary": summary_text})
+
     # Send request to Gemini API
     try:
         # Endpoint URL for Gemini API
@@ -434,12 +748,13 @@ def generate_summary():
         }
 
         # Make the request to Gemini API
-        response = requests.post(url, headers=headers, json=data)
+        response = GEMINI_SESSION.post(url, headers=headers, json=data, timeout=GEMINI_TIMEOUT)
         response.raise_for_status()  # Raise error for bad responses
 
         # Parse the response
         response_json = response.json()
         summary_text = response_json['choices'][0]['message']['content']
+        cache.set(summary_key, summary_text, timeout=SUMMARY_CACHE_TTL)
 
         return jsonify({"summary": summary_text})
 
@@ -455,15 +770,12 @@ def profile():
     user_id = current_user.id
     with get_db_connection() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE id=?", (user_id,))
+        cur.execute(SQL_USER_BY_ID, (user_id,))
         user = cur.fetchone()
 
      # Calculate totals (example queries)
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='income'", (user_id,))
-        total_income = cur.fetchone()[0]
-       
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='expenses'", (user_id,))
-        total_expenses = cur.fetchone()[0]
+        cur.execute(SQL_SUMS, (user_id,))
+        total_income, total_expenses = cur.fetchone()
 
     score = calculate_financial_health(total_income, total_expenses)
 
@@ -508,26 +820,24 @@ def change_password():
             return redirect(url_for('profile'))  # Or the profile page
 
         # Check if the old password is correct
-        conn = sqlite3.connect('finance.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT hash FROM users WHERE id = ?", (current_user.id,))
-        user = cursor.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT hash FROM users WHERE id = ?", (current_user.id,))
+            user = cursor.fetchone()
 
         # If the old password is incorrect
-        if not check_password_hash(user[0], old_password):  # user[0] is the hash field
+        valid, _ = HASH_POOL.submit(verify_password, user[0], old_password).result()  # user[0] is the hash field
+        if not valid:
             flash("Incorrect old password.", "danger")
             return redirect(url_for('profile'))  # Or the profile page
 
         # Update the password
-        hashed_new_password = generate_password_hash(new_password)
+        hashed_new_password = HASH_POOL.submit(hash_password, new_password).result()
 
-        conn = sqlite3.connect('finance.db')
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET hash = ? WHERE id = ?",
-                       (hashed_new_password, current_user.id))
-        conn.commit()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE users SET hash = ? WHERE id = ?",
+                           (hashed_new_password, current_user.id))
 
         flash("Password updated successfully!", "success")
         return redirect(url_for('profile'))  # Or the profile page
@@ -540,22 +850,19 @@ def change_password():
 def delete_account():
     # Confirm with the user before deleting
     try:
-        conn = sqlite3.connect('finance.db')
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        # Delete all user data from transactions (optional: add more related tables)
-        cursor.execute("DELETE FROM transactions WHERE user_id = ?", (current_user.id,))
+            # Delete all user data from transactions (optional: add more related tables)
+            cursor.execute("DELETE FROM transactions WHERE user_id = ?", (current_user.id,))
 
-        # Delete the user's record
-        cursor.execute("DELETE FROM users WHERE id = ?", (current_user.id,))
-        conn.commit()
+            # Delete the user's record
+            cursor.execute("DELETE FROM users WHERE id = ?", (current_user.id,))
+        invalidate_user_cache(current_user.id)
 
         # Log out the user
         logout_user()
 
-        # Close the connection
-        conn.close()
-
         flash("Your account has been deleted successfully.", "success")
         return redirect(url_for('index'))  # Redirect to home page after deletion
 
@@ -565,28 +872,59 @@ def delete_account():
 
 
 # -------- Download Report --------
+def attachment_filename(download_name):
+    """
+    Content-Disposition filename options, encoded the way send_file does.
+
+    Usernames may hold non-ASCII characters, which can't go in a raw header,
+    so those get an ASCII fallback plus an RFC 5987 filename*.
+    """
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        quoted = quote(download_name, safe="!#$&+^`|~")
+        return {"filename": simple, "filename*": f"UTF-8''{quoted}"}
+    return {"filename": download_name}
+
+
 @report_bp.route("/download_report")
 @login_required
 def download_report():
     user_id = current_user.id
 
-    transactions = get_transaction_data(user_id)
-    if not transactions:
+    # CSV is streamed straight from the cursor, no temp file needed
+    if request.args.get("format") == "csv":
+        resp = Response(
+            stream_with_context(generate_transaction_csv(user_id)),
+            mimetype="text/csv"
+        )
+        resp.headers.set(
+            "Content-Disposition",
+            "attachment",
+            **attachment_filename(f"{current_user.username}_transactions.csv")
+        )
+        return resp
+
+    # Stream rows into the PDF in batches; peek at the first to spot an empty history
+    transactions = iter_transaction_data(user_id)
+    first_txn = next(transactions, None)
+    if first_txn is None:
         flash('No transactions available. Add some transactions to generate a report.', 'info')
         return redirect(url_for('dashboard'))
 
-    transactions = format_transactions(transactions)
-    total_income, total_expenses, balance = get_transaction_summary(user_id)
+    total_income, total_expenses, balance = cached_transaction_summary(user_id)
 
     # PDF
     temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
     temp_pdf.close()
     build_transaction_pdf(
-        transactions,
+        chain([first_txn], transactions),
         temp_pdf.name,
         total_income,
         total_expenses,
         balance,
+        category_summary=get_category_summary_db(user_id) if total_expenses else {},
     )
 
     return send_file(
@@ -611,4 +949,4 @@ if __name__ == "__main__":
 
     # 3. Start the server (Waitress)
     from waitress import serve
-    serve(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    serve(app, host="0.0.0.0", port=port, threads=SERVER_THREADS)
\ No newline at end of file
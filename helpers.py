@@ -1,32 +1,330 @@
-from functools import wraps
+from functools import lru_cache, wraps
 from flask import session, redirect, url_for, flash
+from reportlab import rl_config
+# Skip per-attribute validation on ReportLab drawing shapes. It is read when
+# reportlab.graphics is first imported, so it has to be set before that.
+rl_config.shapeChecking = 0
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak, Image
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
+from decimal import Decimal, DecimalException, ROUND_HALF_UP
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+import csv
+from collections import defaultdict
 import sqlite3
-from io import BytesIO
+import threading
+from io import BytesIO, StringIO
+from itertools import islice
 from reportlab.lib.units import inch
 
+DATABASE = "finance.db"
+
+# Applied to every new connection. NORMAL sync only fsyncs at WAL checkpoints
+# instead of on every commit. Waiting on a locked database is already covered
+# by sqlite3.connect's default 5 second timeout.
+PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-20000;
+"""
+
+# journal_mode is persisted in the database file, so it is only switched
+# to WAL once per process rather than on every new connection
+_wal_enabled = False
+
+# Covering indexes for the per-user sums, category breakdowns and date ordering
+INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_txn_user_type ON transactions(user_id, type, amount_cents);
+    CREATE INDEX IF NOT EXISTS idx_txn_user_date ON transactions(user_id, date DESC);
+    CREATE INDEX IF NOT EXISTS idx_txn_user_cat ON transactions(user_id, type, category, amount_cents);
+"""
+
+# Set once the first pooled connection has made sure INDEXES exist, so the
+# indexes are there even when the app is started without running init_db
+_indexes_ensured = False
+
+# One long-lived connection per worker thread, reused across requests
+_local = threading.local()
+
+
+def configure_connection(conn):
+    """Apply the WAL journal mode and tuned PRAGMAs to a new connection."""
+    global _wal_enabled
+    if not _wal_enabled:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_enabled = True
+    conn.executescript(PRAGMAS)
+
+
 def get_db_connection():
-    conn = sqlite3.connect("finance.db")
-    conn.row_factory = sqlite3.Row
+    """
+    Return this thread's pooled connection to the finance database.
+
+    The connection stays open between requests, so callers must not close it;
+    use it as a context manager to commit or roll back a unit of work.
+    """
+    global _indexes_ensured
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE, cached_statements=256)
+        configure_connection(conn)
+        if not _indexes_ensured:
+            conn.executescript(INDEXES)
+            _indexes_ensured = True
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
     return conn
 
 
+# Largest accepted amount ($10 billion). SQLite integers stop at 2**63 - 1, and
+# this bound keeps per-user SUM(amount_cents) far away from overflowing too.
+MAX_AMOUNT_CENTS = 10**12
+
+
+def to_cents(amount):
+    """Convert a user-entered amount such as "12.34" to integer cents."""
+    try:
+        cents = (Decimal(str(amount).strip()) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+    except DecimalException:
+        # Unparseable text, or an exponent too large for Decimal to scale
+        raise ValueError(f"Invalid amount: {amount!r}")
+    if cents.is_nan():
+        raise ValueError(f"Invalid amount: {amount!r}")
+    if abs(cents) > MAX_AMOUNT_CENTS:
+        raise ValueError(f"Amount out of range: {amount!r}")
+    return int(cents)
+
+
+def _dict_factory(cursor, row):
+    """Row factory that builds plain dicts straight from the fetched tuples."""
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+def fetch_all(sql, params=()):
+    """
+    Run a read-only query on the calling thread's pooled connection.
+
+    Rows come back as plain tuples rather than sqlite3.Row, for callers that
+    unpack columns positionally.
+    """
+    cur = get_db_connection().cursor()
+    cur.row_factory = None
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    cur.close()
+    return rows
+
+
+# Rows per multi-row INSERT in bulk_insert_transactions. Each row binds six
+# parameters, so this stays under SQLite's historic 999-variable limit.
+_BULK_INSERT_ROWS = 999 // 6
+
+
+def bulk_insert_transactions(user_id, rows):
+    """
+    Insert many transactions for a user in a single write transaction.
 
-def build_transaction_pdf(transactions, filename, total_income=0, total_expenses=0, balance=0):
+    Each row is a (description, category, type, amount_cents, date) tuple.
+    Rows go in as multi-row INSERT ... VALUES statements, one per chunk.
+    """
+    rows = list(rows)
+    with get_db_connection() as conn:
+        # Take the write lock up front so no other writer slips in between chunks
+        conn.execute("BEGIN IMMEDIATE")
+        for start in range(0, len(rows), _BULK_INSERT_ROWS):
+            chunk = rows[start:start + _BULK_INSERT_ROWS]
+            sql = (
+                "INSERT INTO transactions (user_id, description, category, type, amount_cents, date) VALUES "
+                + ", ".join(["(?, ?, ?, ?, ?, ?)"] * len(chunk))
+            )
+            conn.execute(sql, [value for row in chunk for value in (user_id, *row)])
+    return len(rows)
+
+
+def release_db_connection():
+    """Roll back anything a request left open so the next one starts clean."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+
+# ================================================================
+# REPORT STYLES
+# Built once at import; ReportLab styles are expensive to construct and are
+# never mutated while a report is built.
+# ================================================================
+_STYLES = getSampleStyleSheet()
+
+_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_STYLES['Heading1'],
+    fontSize=28,
+    textColor=colors.HexColor("#0d6efd"),
+    spaceAfter=6,
+    alignment=TA_CENTER,
+    fontName='Helvetica-Bold'
+)
+
+_SUBTITLE_STYLE = ParagraphStyle(
+    'Subtitle',
+    parent=_STYLES['Normal'],
+    fontSize=11,
+    textColor=colors.HexColor("#64748b"),
+    spaceAfter=20,
+    alignment=TA_CENTER,
+    fontName='Helvetica'
+)
+
+_SECTION_STYLE = ParagraphStyle(
+    'SectionHeading',
+    parent=_STYLES['Heading2'],
+    fontSize=14,
+    textColor=colors.HexColor("#1e293b"),
+    spaceAfter=12,
+    spaceBefore=12,
+    fontName='Helvetica-Bold'
+)
+
+_NO_DATA_STYLE = ParagraphStyle(
+    'NoData',
+    parent=_STYLES['Normal'],
+    fontSize=11,
+    textColor=colors.HexColor("#64748b"),
+    alignment=TA_CENTER
+)
+
+_FOOTER_STYLE = ParagraphStyle(
+    'Footer',
+    parent=_STYLES['Normal'],
+    fontSize=9,
+    textColor=colors.HexColor("#94a3b8"),
+    alignment=TA_CENTER,
+    spaceBefore=20,
+    spaceAfter=0
+)
+
+_SUMMARY_TABLE_STYLE = TableStyle([
+    # Header row
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0d6efd")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('ALIGNMENT', (0, 0), (-1, 0), 'CENTER'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 0), (-1, 0), 12),
+
+    # Data rows - alternating backgrounds
+    ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor("#f8fafc")),
+    ('BACKGROUND', (0, 2), (-1, 2), colors.white),
+    ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor("#f8fafc")),
+
+    # All cells
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor("#1e293b")),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 11),
+    ('ALIGNMENT', (0, 1), (0, -1), 'LEFT'),
+    ('ALIGNMENT', (1, 1), (1, -1), 'RIGHT'),
+    ('FONTNAME', (1, 1), (1, -1), 'Helvetica-Bold'),
+
+    # Padding and borders
+    ('TOPPADDING', (0, 1), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#e2e8f0")),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+_CATEGORY_TABLE_STYLE = TableStyle([
+    # Header
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#41b8d5")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('ALIGNMENT', (0, 0), (-1, 0), 'CENTER'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 0), (-1, 0), 12),
+
+    # Data rows
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#f8fafc")),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor("#1e293b")),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+
+    ('ALIGNMENT', (0, 1), (0, -1), 'LEFT'),
+    ('ALIGNMENT', (1, 1), (1, -1), 'RIGHT'),
+    ('ALIGNMENT', (2, 1), (2, -1), 'CENTER'),
+
+    ('TOPPADDING', (0, 1), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#e2e8f0")),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+_TXN_TABLE_STYLE = TableStyle([
+    # Header styling
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#1e3a5f")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('ALIGNMENT', (0, 0), (-1, 0), 'CENTER'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ('TOPPADDING', (0, 0), (-1, 0), 10),
+
+    # Alternating row colors for readability
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f8fafc")]),
+
+    # Text formatting
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor("#1e293b")),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+
+    # Alignment
+    ('ALIGNMENT', (0, 1), (0, -1), 'CENTER'),  # Date center
+    ('ALIGNMENT', (1, 1), (1, -1), 'LEFT'),    # Description left
+    ('ALIGNMENT', (2, 1), (2, -1), 'CENTER'),  # Category center
+    ('ALIGNMENT', (3, 1), (3, -1), 'CENTER'),  # Type center
+    ('ALIGNMENT', (4, 1), (4, -1), 'RIGHT'),   # Amount right
+
+    # Padding and grid
+    ('TOPPADDING', (0, 1), (-1, -1), 7),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 7),
+    ('LEFTPADDING', (0, 0), (-1, -1), 8),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#e2e8f0")),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+
+    # Border styling - thicker header border
+    ('LINEBELOW', (0, 0), (-1, 0), 1, colors.HexColor("#e2e8f0")),
+])
+
+
+# Transaction rows per table flowable. ReportLab copies the remaining rows each
+# time a table splits across a page, so one huge table costs O(N^2) to lay out.
+_TXN_TABLE_CHUNK = 500
+
+# Bound formatters for report cells, reused for every amount and percentage
+_MONEY = "${:,.2f}".format
+_PCT = "{:.1f}%".format
+
+
+def build_transaction_pdf(transactions, filename, total_income=0, total_expenses=0, balance=0, category_summary=None):
     """
     Build a professional-looking financial report PDF
     
     Args:
-        transactions: List of transaction dictionaries
+        transactions: Iterable of transaction dictionaries; may be a
+            generator, which is consumed once in chunks
         filename: Path where PDF will be saved
         total_income: Total income amount
         total_expenses: Total expenses amount
         balance: Net balance
+        category_summary: Pre-aggregated {category: amount} expense breakdown;
+            computed from transactions when not given and total_expenses
+            is non-zero
     """
     try:
         # Create PDF document
@@ -41,87 +339,29 @@ def build_transaction_pdf(transactions, filename, total_income=0, total_expenses
         )
         
         elements = []
-        styles = getSampleStyleSheet()
-        
-        # Define custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=28,
-            textColor=colors.HexColor("#0d6efd"),
-            spaceAfter=6,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Normal'],
-            fontSize=11,
-            textColor=colors.HexColor("#64748b"),
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            fontName='Helvetica'
-        )
-        
-        section_style = ParagraphStyle(
-            'SectionHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor("#1e293b"),
-            spaceAfter=12,
-            spaceBefore=12,
-            fontName='Helvetica-Bold'
-        )
+        # One timestamp for the header date and the footer
+        now = datetime.now()
         
         # HEADER SECTION
         elements.append(Paragraph(
-            f"Financial Report - {datetime.now().strftime('%B %d, %Y')}",
-            subtitle_style
+            f"Financial Report - {now:%B %d, %Y}",
+            _SUBTITLE_STYLE
         ))
         elements.append(Spacer(1, 12))
         
         # FINANCIAL SUMMARY SECTION
-        elements.append(Paragraph("Financial Summary", section_style))
+        elements.append(Paragraph("Financial Summary", _SECTION_STYLE))
         
         # Summary cards style
         summary_data = [
             ["Metric", "Amount"],
-            ["Total Income", f"${total_income:,.2f}"],
-            ["Total Expenses", f"${total_expenses:,.2f}"],
-            ["Net Balance", f"${balance:,.2f}"]
+            ["Total Income", _MONEY(total_income)],
+            ["Total Expenses", _MONEY(total_expenses)],
+            ["Net Balance", _MONEY(balance)]
         ]
         
         summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            # Header row
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0d6efd")),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('ALIGNMENT', (0, 0), (-1, 0), 'CENTER'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('TOPPADDING', (0, 0), (-1, 0), 12),
-            
-            # Data rows - alternating backgrounds
-            ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor("#f8fafc")),
-            ('BACKGROUND', (0, 2), (-1, 2), colors.white),
-            ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor("#f8fafc")),
-            
-            # All cells
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor("#1e293b")),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 11),
-            ('ALIGNMENT', (0, 1), (0, -1), 'LEFT'),
-            ('ALIGNMENT', (1, 1), (1, -1), 'RIGHT'),
-            ('FONTNAME', (1, 1), (1, -1), 'Helvetica-Bold'),
-            
-            # Padding and borders
-            ('TOPPADDING', (0, 1), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#e2e8f0")),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+        summary_table.setStyle(_SUMMARY_TABLE_STYLE)
         
         elements.append(summary_table)
         elements.append(Spacer(1, 20))
@@ -129,10 +369,15 @@ def build_transaction_pdf(transactions, filename, total_income=0, total_expenses
         # ================================================================
         # EXPENSE BREAKDOWN SECTION (if there are expenses)
         # ================================================================
-        category_summary = get_category_summary(transactions)
+        if category_summary is None:
+            if total_expenses:
+                transactions = list(transactions)
+                category_summary = get_category_summary(transactions)
+            else:
+                category_summary = {}
         
         if category_summary:
-            elements.append(Paragraph("Expense Breakdown by Category", section_style))
+            elements.append(Paragraph("Expense Breakdown by Category", _SECTION_STYLE))
             
             category_data = [["Category", "Amount", "Percentage"]]
             total_expenses_calc = sum(category_summary.values())
@@ -141,36 +386,12 @@ def build_transaction_pdf(transactions, filename, total_income=0, total_expenses
                 percentage = (amount / total_expenses_calc * 100) if total_expenses_calc > 0 else 0
                 category_data.append([
                     category,
-                    f"${amount:,.2f}",
-                    f"{percentage:.1f}%"
+                    _MONEY(amount),
+                    _PCT(percentage)
                 ])
             
             category_table = Table(category_data, colWidths=[2.5*inch, 1.5*inch, 1*inch])
-            category_table.setStyle(TableStyle([
-                # Header
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#41b8d5")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 11),
-                ('ALIGNMENT', (0, 0), (-1, 0), 'CENTER'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TOPPADDING', (0, 0), (-1, 0), 12),
-                
-                # Data rows
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#f8fafc")),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor("#1e293b")),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                
-                ('ALIGNMENT', (0, 1), (0, -1), 'LEFT'),
-                ('ALIGNMENT', (1, 1), (1, -1), 'RIGHT'),
-                ('ALIGNMENT', (2, 1), (2, -1), 'CENTER'),
-                
-                ('TOPPADDING', (0, 1), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#e2e8f0")),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
+            category_table.setStyle(_CATEGORY_TABLE_STYLE)
             
             elements.append(category_table)
             elements.append(Spacer(1, 20))
@@ -178,79 +399,43 @@ def build_transaction_pdf(transactions, filename, total_income=0, total_expenses
         # ================================================================
         # TRANSACTIONS TABLE
         # ================================================================
-        elements.append(Paragraph("Transaction Details", section_style))
+        elements.append(Paragraph("Transaction Details", _SECTION_STYLE))
         
-        if transactions:
-            table_data = [["Date", "Description", "Category", "Type", "Amount"]]
-            
-            for txn in transactions:
-                # Color code by type
-                amount_str = f"${txn.get('amount', 0):,.2f}"
-                
-                table_data.append([
-                    txn.get("date", ""),
-                    txn.get("description", "")[:30],  # Limit description length
-                    txn.get("category", ""),
-                    txn.get("type", ""),
-                    amount_str
-                ])
-            
-            # Create table with proper column widths
-            table = Table(
-                table_data,
-                colWidths=[1.2*inch, 2.2*inch, 1.2*inch, 0.8*inch, 1.0*inch],
-                hAlign='LEFT'
-            )
-            
-            table.setStyle(TableStyle([
-                # Header styling
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#1e3a5f")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('ALIGNMENT', (0, 0), (-1, 0), 'CENTER'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('TOPPADDING', (0, 0), (-1, 0), 10),
-                
-                # Alternating row colors for readability
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f8fafc")]),
-                
-                # Text formatting
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor("#1e293b")),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
+        rows = iter(transactions)
+        chunk = list(islice(rows, _TXN_TABLE_CHUNK))
+        
+        if chunk:
+            # One table per chunk, built as rows are pulled from the iterable.
+            # Report rows always carry every column, so index them directly.
+            while chunk:
+                table_data = [["Date", "Description", "Category", "Type", "Amount"]]
+                table_data.extend(
+                    [
+                        txn["date"],
+                        txn["description"],
+                        txn["category"],
+                        txn["type"],
+                        _MONEY(txn["amount"])
+                    ]
+                    for txn in chunk
+                )
                 
-                # Alignment
-                ('ALIGNMENT', (0, 1), (0, -1), 'CENTER'),  # Date center
-                ('ALIGNMENT', (1, 1), (1, -1), 'LEFT'),    # Description left
-                ('ALIGNMENT', (2, 1), (2, -1), 'CENTER'),  # Category center
-                ('ALIGNMENT', (3, 1), (3, -1), 'CENTER'),  # Type center
-                ('ALIGNMENT', (4, 1), (4, -1), 'RIGHT'),   # Amount right
+                # Create table with proper column widths
+                table = LongTable(
+                    table_data,
+                    colWidths=[1.2*inch, 2.2*inch, 1.2*inch, 0.8*inch, 1.0*inch],
+                    hAlign='LEFT',
+                    repeatRows=1
+                )
                 
-                # Padding and grid
-                ('TOPPADDING', (0, 1), (-1, -1), 7),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 7),
-                ('LEFTPADDING', (0, 0), (-1, -1), 8),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#e2e8f0")),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                table.setStyle(_TXN_TABLE_STYLE)
                 
-                # Border styling - thicker header border
-                ('LINEBELOW', (0, 0), (-1, 0), 1, colors.HexColor("#e2e8f0")),
-            ]))
-            
-            elements.append(table)
+                elements.append(table)
+                chunk = list(islice(rows, _TXN_TABLE_CHUNK))
         else:
             elements.append(Paragraph(
                 "No transactions available.",
-                ParagraphStyle(
-                    'NoData',
-                    parent=styles['Normal'],
-                    fontSize=11,
-                    textColor=colors.HexColor("#64748b"),
-                    alignment=TA_CENTER
-                )
+                _NO_DATA_STYLE
             ))
         
         elements.append(Spacer(1, 30))
@@ -258,23 +443,13 @@ def build_transaction_pdf(transactions, filename, total_income=0, total_expenses
         # ================================================================
         # FOOTER SECTION
         # ================================================================
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor("#94a3b8"),
-            alignment=TA_CENTER,
-            spaceBefore=20,
-            spaceAfter=0
-        )
-        
         elements.append(Paragraph(
             "Generated by BudgetBuddy Financial Tracker",
-            footer_style
+            _FOOTER_STYLE
         ))
         elements.append(Paragraph(
-            f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            footer_style
+            f"{now:%Y-%m-%d %H:%M:%S}",
+            _FOOTER_STYLE
         ))
         
         # Build the PDF
@@ -301,42 +476,77 @@ def login_required(f):
     return decorated_function
 
 
-def get_transaction_data(user_id):
-    conn = sqlite3.connect("finance.db")
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+# Dates are trimmed to YYYY-MM-DD by SQLite; values date() can't parse pass through as-is.
+# Descriptions are cut to the 30 characters the PDF table has room for.
+_REPORT_TXN_SQL = """
+    SELECT COALESCE(date(date), date) AS date, amount_cents / 100.0 AS amount, type, category,
+           COALESCE(substr(description, 1, 30), '') AS description
+    FROM transactions
+    WHERE user_id = ?
+    ORDER BY transactions.date DESC
+"""
 
-    cur.execute(
-        "SELECT date, amount, type, category, description FROM transactions WHERE user_id = ? ORDER BY date DESC",
-        (user_id,)
-    )
-    transactions = cur.fetchall()
-    conn.close()
 
-    # Convert to list of dicts for PDF helper
-    return [dict(txn) for txn in transactions]
+def iter_transaction_data(user_id, batch_size=1000):
+    """
+    Yield a user's transactions as dicts for the PDF report.
+
+    Rows are fetched from the cursor in batches, so the report never holds
+    the user's whole history in memory at once.
+    """
+    cur = get_db_connection().cursor()
+    cur.row_factory = _dict_factory
+    cur.execute(_REPORT_TXN_SQL, (user_id,))
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+    cur.close()
 
 
-def get_transaction_summary(user_id):
-    conn = sqlite3.connect("finance.db")
-    cur = conn.cursor()
+def generate_transaction_csv(user_id, batch_size=1000):
+    """
+    Yield a user's transactions as CSV text, one chunk per batch of rows.
 
-    # Sum of all Income
+    Rows are pulled from the cursor with fetchmany, so memory use stays
+    constant no matter how many transactions the user has.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Date", "Description", "Category", "Type", "Amount"])
+    yield buffer.getvalue()
+
+    cur = get_db_connection().cursor()
     cur.execute(
-        "SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='income'",
+        "SELECT date, description, category, type, amount_cents / 100.0 FROM transactions WHERE user_id = ? ORDER BY date DESC",
         (user_id,)
     )
-    total_income = cur.fetchone()[0] or 0  # if no income, default to 0
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+    cur.close()
 
-    # Sum of all Expenses
+
+def get_transaction_summary(user_id):
+    cur = get_db_connection().cursor()
+
+    # Income and expense totals in one grouped pass
     cur.execute(
-        "SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='expenses'",
+        "SELECT type, SUM(amount_cents) / 100.0 FROM transactions WHERE user_id=? GROUP BY type",
         (user_id,)
     )
-    total_expenses = cur.fetchone()[0] or 0
+    totals = dict(cur.fetchall())
+    cur.close()
 
+    total_income = totals.get("income", 0)  # if no income, default to 0
+    total_expenses = totals.get("expenses", 0)
     balance = total_income - total_expenses
-    conn.close()
 
     return total_income, total_expenses, balance
 
@@ -350,33 +560,31 @@ def format_transactions(transactions):
 
 def get_category_summary(transactions):
     """Get spending breakdown by category"""
-    category_summary = {}
+    category_summary = defaultdict(float)
+    to_float = float
     
     for txn in transactions:
-        if txn.get("type") == "expense":
-            category = txn.get("category", "Uncategorized")
-            amount = float(txn.get("amount", 0))
-            
-            if category not in category_summary:
-                category_summary[category] = 0
-            category_summary[category] += amount
+        get = txn.get
+        if get("type") == "expenses":
+            category_summary[get("category", "Uncategorized")] += to_float(get("amount", 0))
     
     # Sort by amount (descending)
     return dict(sorted(category_summary.items(), key=lambda x: x[1], reverse=True))
 
 
-def get_last_month_expenses(user_id):
-    """
-    Helper function to get the previous month's total expenses.
-    """
-    from datetime import datetime, timedelta
-    last_month = (datetime.now() - timedelta(days=30)).month
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT SUM(amount) FROM transactions WHERE user_id=? AND type='expenses' AND strftime('%m', date) = ?", (user_id, last_month))
-        result = cur.fetchone()
-    return result[0] if result[0] else 0
+def get_category_summary_db(user_id):
+    """Get spending breakdown by category, aggregated by SQLite"""
+    cur = get_db_connection().cursor()
+    cur.execute(
+        "SELECT category, SUM(amount_cents) / 100.0 FROM transactions WHERE user_id=? AND type='expenses' GROUP BY category ORDER BY 2 DESC",
+        (user_id,)
+    )
+    category_summary = dict(cur.fetchall())
+    cur.close()
+    return category_summary
+
 
+@lru_cache(maxsize=256)
 def calculate_financial_health(total_income, total_expenses):
     """
     Calculate a financial health score as 0-100 based on income and expenses.
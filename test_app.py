@@ -0,0 +1,304 @@
+import gzip
+
+import pytest
+from argon2 import PasswordHasher
+from werkzeug.security import generate_password_hash
+
+import app as budget_app
+import helpers
+
+
+def close_pooled_connection():
+    # The pool keeps one connection per thread; drop it along with the temp database
+    conn = getattr(helpers._local, "conn", None)
+    if conn is not None:
+        conn.close()
+        helpers._local.conn = None
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # finance.db is opened relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    budget_app.app.config["TESTING"] = True
+    budget_app.init_db()
+    # Cache keys reuse user ids, which restart at 1 in every temp database
+    budget_app.cache.clear()
+    budget_app.limiter.reset()
+
+    client = budget_app.app.test_client()
+    client.post("/register", data={"username": "alice", "password": "password123", "confirmation": "password123"})
+    yield client
+    close_pooled_connection()
+
+
+def login(client):
+    return client.post("/login", data={"username": "alice", "password": "password123"})
+
+
+def test_dashboard_revalidates_through_compression(client):
+    accept_gzip = {"Accept-Encoding": "gzip"}
+    login(client)
+
+    # Flash messages are pending, so the page must not carry a validator
+    first = client.get("/dashboard", headers=accept_gzip)
+    assert first.status_code == 200
+    assert first.headers.get("ETag") is None
+
+    page = client.get("/dashboard", headers=accept_gzip)
+    assert page.status_code == 200
+    assert page.headers["Content-Encoding"] == "gzip"
+    etag, weak = page.get_etag()
+    assert weak and ":gzip" not in etag
+
+    revalidated = client.get("/dashboard", headers={**accept_gzip, "If-None-Match": page.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+def test_dashboard_never_304s_over_pending_flash(client):
+    accept_gzip = {"Accept-Encoding": "gzip"}
+    login(client)
+    client.get("/dashboard", headers=accept_gzip)
+    page = client.get("/dashboard", headers=accept_gzip)
+
+    # Logging in again queues a flash without changing the user's data
+    client.get("/logout")
+    login(client)
+    resp = client.get("/dashboard", headers={**accept_gzip, "If-None-Match": page.headers["ETag"]})
+    assert resp.status_code == 200
+    assert b"Login successful!" in gzip.decompress(resp.get_data())
+
+
+def test_first_request_migrates_legacy_schema(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(budget_app, "_schema_ready", False)
+    conn = helpers.sqlite3.connect("finance.db")
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE, hash TEXT NOT NULL);
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, description TEXT NOT NULL,
+            category TEXT NOT NULL, type TEXT NOT NULL, amount REAL NOT NULL, date TEXT NOT NULL
+        );
+    """)
+    conn.close()
+
+    # No init_db here, just as under `flask run`
+    client = budget_app.app.test_client()
+    resp = client.post("/register", data={"username": "alice", "password": "password123", "confirmation": "password123"})
+    assert resp.status_code == 302
+    assert login(client).status_code == 302
+    assert client.get("/dashboard").status_code == 200
+    close_pooled_connection()
+
+
+@pytest.mark.parametrize("amount", ["1e20", "-1e20", "1e999999999", "nan", "abc"])
+def test_out_of_range_amounts_are_rejected(client, amount):
+    login(client)
+    txn = {"description": "big", "category": "Food", "type": "expenses", "amount": amount, "date": "2025-10-01"}
+
+    resp = client.post("/transactions", data=txn)
+    assert resp.status_code == 302
+    assert client.post("/transactions/bulk", json=[txn]).status_code == 400
+    with helpers.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+
+
+def test_report_totals_follow_writes(client):
+    login(client)
+    txn = {"description": "lunch", "category": "Food", "type": "expenses", "amount": "12.50", "date": "2025-10-01"}
+    client.post("/transactions", data=txn)
+
+    with budget_app.app.test_request_context():
+        assert budget_app.cached_transaction_summary(1) == (0, 12.5, -12.5)
+
+    client.post("/transactions", data={**txn, "type": "income", "amount": "100"})
+    with budget_app.app.test_request_context():
+        assert budget_app.cached_transaction_summary(1) == (100.0, 12.5, 87.5)
+
+
+def test_failed_migration_is_retried(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(budget_app, "_schema_ready", False)
+    # A table the migration can't read yet: no amount column to convert
+    conn = helpers.sqlite3.connect("finance.db")
+    conn.execute("CREATE TABLE transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, description TEXT)")
+    conn.close()
+
+    assert budget_app.init_db() is False
+    assert budget_app.app.test_client().get("/").status_code == 200
+    assert budget_app._schema_ready is False
+    close_pooled_connection()
+
+
+def test_migration_keeps_legacy_type_values(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = helpers.sqlite3.connect("finance.db")
+    conn.executescript("""
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, description TEXT NOT NULL,
+            category TEXT NOT NULL, type TEXT NOT NULL, amount REAL NOT NULL, date TEXT NOT NULL
+        );
+        INSERT INTO transactions (user_id, description, category, type, amount, date)
+        VALUES (1, 'old', 'Food', 'expense', 4.25, '2024-01-01');
+    """)
+    conn.close()
+
+    assert budget_app.init_db() is True
+    conn = helpers.sqlite3.connect("finance.db")
+    assert conn.execute("SELECT type, amount_cents FROM transactions").fetchall() == [("expense", 425)]
+    conn.close()
+
+
+def test_report_totals_hit_skips_the_query(client, monkeypatch):
+    login(client)
+    calls = []
+    real_summary = budget_app.get_transaction_summary
+    monkeypatch.setattr(budget_app, "get_transaction_summary", lambda uid: calls.append(uid) or real_summary(uid))
+
+    with budget_app.app.test_request_context():
+        budget_app.cached_transaction_summary(1)
+        budget_app.cached_transaction_summary(1)
+    assert calls == [1]
+
+    client.post("/transactions", data={"description": "x", "category": "Food", "type": "expenses", "amount": "1", "date": "2025-10-01"})
+    with budget_app.app.test_request_context():
+        assert budget_app.cached_transaction_summary(1) == (0, 1.0, -1.0)
+    assert calls == [1, 1]
+
+
+def test_bulk_insert_stores_every_row_in_cents(client):
+    login(client)
+    batch = [
+        {"description": f"item {i}", "category": "Food", "type": "expenses", "amount": "1.05", "date": "2025-10-01"}
+        for i in range(400)
+    ]
+
+    resp = client.post("/transactions/bulk", json=batch)
+    assert resp.status_code == 201
+    assert resp.get_json() == {"inserted": 400}
+    with helpers.get_db_connection() as conn:
+        assert tuple(conn.execute("SELECT COUNT(*), SUM(amount_cents) FROM transactions WHERE user_id = 1").fetchone()) == (400, 42000)
+
+
+@pytest.mark.parametrize("bad", [
+    {"description": {"a": 1}},
+    {"date": ["2025-10-01"]},
+    {"type": "bogus"},
+    {"amount": "12..5"},
+])
+def test_bulk_insert_rejects_a_mixed_batch_whole(client, bad):
+    login(client)
+    good = {"description": "ok", "category": "Food", "type": "expenses", "amount": "2", "date": "2025-10-01"}
+
+    resp = client.post("/transactions/bulk", json=[good] * 300 + [{**good, **bad}])
+    assert resp.status_code == 400
+    with helpers.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+
+
+def test_bulk_insert_rolls_back_every_chunk_on_failure(client):
+    rows = [("ok", "Food", "expenses", 200, "2025-10-01")] * 300 + [(None, "Food", "expenses", 200, "2025-10-01")]
+
+    with pytest.raises(helpers.sqlite3.IntegrityError):
+        helpers.bulk_insert_transactions(1, rows)
+    with helpers.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+
+
+@pytest.mark.parametrize("category_expenses", [["Food", 12], "Food: 12", 12])
+def test_summary_rejects_non_object_category_expenses(client, category_expenses):
+    login(client)
+    resp = client.post("/analytics/generate_summary", json={"total_income": 10, "total_expenses": 12, "category_expenses": category_expenses})
+    assert resp.status_code == 400
+
+
+def set_stored_hash(stored_hash):
+    with helpers.get_db_connection() as conn:
+        conn.execute("UPDATE users SET hash = ? WHERE username = 'alice'", (stored_hash,))
+
+
+def stored_hash():
+    with helpers.get_db_connection() as conn:
+        return conn.execute("SELECT hash FROM users WHERE username = 'alice'").fetchone()[0]
+
+
+def test_legacy_werkzeug_hash_is_upgraded_on_login(client):
+    set_stored_hash(generate_password_hash("password123"))
+
+    assert login(client).status_code == 302
+    upgraded = stored_hash()
+    assert upgraded.startswith("$argon2")
+    assert budget_app.verify_password(upgraded, "password123") == (True, None)
+
+
+def test_wrong_password_against_legacy_hash_is_refused(client):
+    legacy = generate_password_hash("password123")
+    set_stored_hash(legacy)
+
+    resp = client.post("/login", data={"username": "alice", "password": "not-the-password"})
+    assert resp.status_code == 200
+    assert b"Invalid username or password" in resp.get_data()
+    assert stored_hash() == legacy
+    assert client.get("/dashboard").status_code == 302
+
+
+def test_outdated_argon2_parameters_are_rehashed_on_login(client):
+    weak = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1).hash("password123")
+    set_stored_hash(weak)
+
+    assert login(client).status_code == 302
+    rehashed = stored_hash()
+    assert rehashed != weak
+    assert not budget_app.password_hasher.check_needs_rehash(rehashed)
+
+
+def test_users_cannot_delete_each_others_transactions(client):
+    login(client)
+    client.post("/transactions", data={"description": "rent", "category": "Housing", "type": "expenses", "amount": "900", "date": "2025-10-01"})
+    with helpers.get_db_connection() as conn:
+        txn_id = conn.execute("SELECT id FROM transactions").fetchone()[0]
+    client.get("/logout")
+
+    other = budget_app.app.test_client()
+    other.post("/register", data={"username": "mallory", "password": "password123", "confirmation": "password123"})
+    other.post("/login", data={"username": "mallory", "password": "password123"})
+    resp = other.post(f"/delete_transaction/{txn_id}", follow_redirects=True)
+    assert b"Transaction not found or unauthorized." in resp.get_data()
+    with helpers.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 1
+
+    login(client)
+    resp = client.post(f"/delete_transaction/{txn_id}", follow_redirects=True)
+    assert b"Transaction deleted successfully." in resp.get_data()
+    with helpers.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+
+
+def test_csv_report_streams_every_row(client):
+    login(client)
+    batch = [
+        {"description": f"item {i}", "category": "Food", "type": "expenses", "amount": "2.50", "date": "2025-10-01"}
+        for i in range(1200)
+    ]
+    client.post("/transactions/bulk", json=batch)
+
+    resp = client.get("/download_report?format=csv")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.mimetype == "text/csv"
+    assert resp.headers["Content-Disposition"] == "attachment; filename=alice_transactions.csv"
+    lines = resp.get_data(as_text=True).splitlines()
+    assert lines[0] == "Date,Description,Category,Type,Amount"
+    assert len(lines) == 1201
+    assert lines[1].endswith(",Food,expenses,2.5")
+
+
+def test_csv_report_filename_survives_non_ascii_usernames(client):
+    client.post("/register", data={"username": "测试 user", "password": "password123", "confirmation": "password123"})
+    client.post("/login", data={"username": "测试 user", "password": "password123"})
+
+    resp = client.get("/download_report?format=csv")
+    assert resp.status_code == 200
+    disposition = resp.headers["Content-Disposition"]
+    disposition.encode("latin-1")
+    assert "filename*=UTF-8''%E6%B5%8B%E8%AF%95%20user_transactions.csv" in disposition